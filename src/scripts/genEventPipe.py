@@ -1,8 +1,10 @@
-﻿from __future__ import print_function
-from genEventing import *
+﻿from genEventing import *
 from genLttngProvider import *
+from functools import reduce
+import multiprocessing
+import operator
 import os
-import xml.dom.minidom as DOM
+import xml.etree.ElementTree as ET
 from utilities import open_for_update, parseExclusionList
 
 stdprolog_cpp = """// Licensed to the .NET Foundation under one or more agreements.
@@ -31,128 +33,171 @@ stdprolog_cmake = """#
 
 eventpipe_dirname = "eventpipe"
 
-def generateMethodSignatureEnabled(eventName):
-    return "BOOL EventPipeEventEnabled%s()" % (eventName,)
+# Find the src directory starting with the assumption that
+# A) It is named 'src'
+# B) This script lives in it
+src_dirname = os.path.dirname(__file__)
+while os.path.basename(src_dirname) != "src":
+    src_dirname = os.path.dirname(src_dirname)
 
-def generateMethodSignatureWrite(eventName, template, extern):
-    sig_pieces = []
+    if os.path.basename(src_dirname) == "":
+        raise IOError("Could not find the Core CLR 'src' directory")
 
-    if extern: sig_pieces.append('extern "C" ')
-    sig_pieces.append("ULONG EventPipeWriteEvent")
-    sig_pieces.append(eventName)
-    sig_pieces.append("(")
+eventpipe_impl_header = """
+#include "%(root)s/vm/common.h"
+#include "%(root)s/vm/eventpipeprovider.h"
+#include "%(root)s/vm/eventpipeevent.h"
+#include "%(root)s/vm/eventpipe.h"
 
-    if template:
-        sig_pieces.append("\n")
-        fnSig = template.signature
-        for paramName in fnSig.paramlist:
-            fnparam = fnSig.getParam(paramName)
-            wintypeName = fnparam.winType
-            typewName = palDataTypeMapping[wintypeName]
-            winCount = fnparam.count
-            countw = palDataTypeMapping[winCount]
-
-            if paramName in template.structs:
-                sig_pieces.append(
-                    "%sint %s_ElementSize,\n" %
-                    (lindent, paramName))
-
-            sig_pieces.append(lindent)
-            sig_pieces.append(typewName)
-            if countw != " ":
-                sig_pieces.append(countw)
-
-            sig_pieces.append(" ")
-            sig_pieces.append(fnparam.name)
-            sig_pieces.append(",\n")
-
-    sig_pieces.append(lindent)
-    sig_pieces.append("LPCGUID ActivityId,\n")
-    sig_pieces.append(lindent)
-    sig_pieces.append("LPCGUID RelatedActivityId")
-    sig_pieces.append(")")
-    return ''.join(sig_pieces)
+#if defined(FEATURE_PAL)
+#define wcslen PAL_wcslen
+#endif
 
-def generateClrEventPipeWriteEventsImpl(
-        providerName, eventNodes, allTemplates, extern, exclusionList):
-    providerPrettyName = providerName.replace("Windows-", '')
-    providerPrettyName = providerPrettyName.replace("Microsoft-", '')
-    providerPrettyName = providerPrettyName.replace('-', '_')
-    WriteEventImpl = []
+bool ResizeBuffer(char *&buffer, size_t& size, size_t currLen, size_t newSize, bool &fixedBuffer);
+bool WriteToBuffer(PCWSTR str, char *&buffer, size_t& offset, size_t& size, bool &fixedBuffer);
+bool WriteToBuffer(const char *str, char *&buffer, size_t& offset, size_t& size, bool &fixedBuffer);
+bool WriteToBuffer(const BYTE *src, size_t len, char *&buffer, size_t& offset, size_t& size, bool &fixedBuffer);
 
-    # EventPipeEvent declaration
-    for eventNode in eventNodes:
-        eventName = eventNode.getAttribute('symbol')
-        WriteEventImpl.append(
-            "EventPipeEvent *EventPipeEvent" +
-            eventName +
-            " = nullptr;\n")
-
-    for eventNode in eventNodes:
-        eventName = eventNode.getAttribute('symbol')
-        templateName = eventNode.getAttribute('template')
-
-        # generate EventPipeEventEnabled function
-        eventEnabledImpl = generateMethodSignatureEnabled(eventName) + """
+template <typename T>
+bool WriteToBuffer(const T &value, char *&buffer, size_t& offset, size_t& size, bool &fixedBuffer)
 {
-    return EventPipeEvent%s->IsEnabled();
+    if (sizeof(T) + offset > size)
+    {
+        if (!ResizeBuffer(buffer, size, offset, size + sizeof(T), fixedBuffer))
+            return false;
+    }
+
+    memcpy(buffer + offset, (char *)&value, sizeof(T));
+    offset += sizeof(T);
+    return true;
 }
 
-""" % eventName
-        WriteEventImpl.append(eventEnabledImpl)
+""" % {'root': src_dirname.replace('\\', '/')}
+
+def memoize(fn):
+    # caches the result of a single argument function
+    cache = {}
+    def memoized(arg):
+        if arg not in cache:
+            cache[arg] = fn(arg)
+        return cache[arg]
+    return memoized
+
+def removePrefix(name, prefix):
+    # str.removeprefix is only available from Python 3.9 on
+    if name.startswith(prefix):
+        return name[len(prefix):]
+    return name
+
+def trimProviderPrefixes(providerName):
+    # "Microsoft-" comes first in names such as Microsoft-Windows-DotNETRuntime
+    return removePrefix(removePrefix(providerName, "Microsoft-"), "Windows-")
+
+@memoize
+def getProviderPrettyName(providerName):
+    providerPrettyName = trimProviderPrefixes(providerName)
+    return providerPrettyName.replace('-', '_')
+
+@memoize
+def getProviderFileName(providerName):
+    providerName_File = trimProviderPrefixes(providerName)
+    providerName_File = providerName_File.replace('-', '')
+    return providerName_File.lower()
+
+def getNamespace(element):
+    # ElementTree qualifies tags as '{uri}tag', return the '{uri}' prefix if there is one
+    return element.tag[:element.tag.find('}') + 1]
+
+eventPipeWriteEventSignature = """%(extern)sULONG EventPipeWriteEvent%(eventName)s(%(params)s)"""
+
+eventPipeEventImpl = """%(enabledSignature)s
+{
+    return EventPipeEvent%(eventName)s->IsEnabled();
+}
 
-        # generate EventPipeWriteEvent function
-        fnptype = []
+%(writeSignature)s
+{
+    if (!EventPipeEventEnabled%(eventName)s())
+        return ERROR_SUCCESS;
+%(body)s
+    return ERROR_SUCCESS;
+}
 
-        if templateName:
-            template = allTemplates[templateName]
-        else:
-            template = None
+"""
 
-        fnptype.append(generateMethodSignatureWrite(eventName, template, extern))
-        fnptype.append("\n{\n")
-        checking = """    if (!EventPipeEventEnabled%s())
-        return ERROR_SUCCESS;
-""" % (eventName)
+eventPipeEmptyWriteEventBody = """    EventPipe::WriteEvent(*EventPipeEvent%s, (BYTE*) nullptr, 0, ActivityId, RelatedActivityId);
+"""
+
+eventPipeProviderInitImpl = """%(extern)svoid Init%(providerPrettyName)s()
+{
+    EventPipeProvider%(providerPrettyName)s = EventPipe::CreateProvider(SL(%(providerPrettyName)sName), EventPipeEtwCallback%(providerPrettyName)s);
+%(addEvents)s}"""
+
+eventPipeAddEvent = """    EventPipeEvent%s = EventPipeProvider%s->AddEvent(%s,%s,%s,%s,%s);
+"""
+
+def generateMethodSignatureEnabled(eventName):
+    return "BOOL EventPipeEventEnabled%s()" % (eventName,)
+
+# The parameter list only depends on the template, so it is generated once per
+# template and shared by all its events
+@memoize
+def generateMethodSignatureWriteParams(template):
+    params = []
+
+    if template:
+        for typewName, countw, fnparam in template.param_rendering:
+            if fnparam.is_struct:
+                params.append("%sint %s_ElementSize" % (lindent, fnparam.name))
+
+            params.append("%s%s%s %s" % (lindent, typewName, countw.strip(), fnparam.name))
+
+    params.append("%sLPCGUID ActivityId" % (lindent,))
+    params.append("%sLPCGUID RelatedActivityId" % (lindent,))
+
+    return ("\n" if template else "") + ",\n".join(params)
+
+def generateMethodSignatureWrite(eventName, template, extern):
+    return eventPipeWriteEventSignature % {
+        'extern': 'extern "C" ' if extern else '',
+        'eventName': eventName,
+        'params': generateMethodSignatureWriteParams(template)}
 
-        fnptype.append(checking)
+def generateClrEventPipeWriteEventsImpl(
+        out, providerName, providerPrettyName, events, allTemplates, keywordMask, extern, exclusionList):
+    # EventPipeEvent declaration
+    for attrs in events:
+        eventName = attrs['symbol']
+        out.write("EventPipeEvent *EventPipeEvent%s = nullptr;\n" % (eventName,))
 
-        WriteEventImpl.extend(fnptype)
+    # generate EventPipeEventEnabled and EventPipeWriteEvent functions
+    for attrs in events:
+        eventName = attrs['symbol']
+        templateName = attrs.get('template')
 
-        if template:
+        if templateName:
+            template = allTemplates[templateName]
             body = generateWriteEventBody(template, providerName, eventName)
-            WriteEventImpl.append(body)
         else:
-            WriteEventImpl.append(
-                "    EventPipe::WriteEvent(*EventPipeEvent" +
-                eventName +
-                ", (BYTE*) nullptr, 0, ActivityId, RelatedActivityId);\n")
+            template = None
+            body = eventPipeEmptyWriteEventBody % (eventName,)
 
-        WriteEventImpl.append("\n    return ERROR_SUCCESS;\n}\n\n")
+        out.write(eventPipeEventImpl % {
+            'enabledSignature': generateMethodSignatureEnabled(eventName),
+            'writeSignature': generateMethodSignatureWrite(eventName, template, extern),
+            'eventName': eventName,
+            'body': body})
 
     # EventPipeProvider and EventPipeEvent initialization
-    callbackName = 'EventPipeEtwCallback' + providerPrettyName
-    if extern: WriteEventImpl.append('extern "C" ')
-    WriteEventImpl.append(
-        "void Init" +
-        providerPrettyName +
-        "()\n{\n")
-    WriteEventImpl.append(
-        "    EventPipeProvider" +
-        providerPrettyName +
-        " = EventPipe::CreateProvider(SL(" +
-        providerPrettyName +
-        "Name), " + callbackName + ");\n")
-    for eventNode in eventNodes:
-        eventName = eventNode.getAttribute('symbol')
-        templateName = eventNode.getAttribute('template')
-        eventKeywords = eventNode.getAttribute('keywords')
-        eventKeywordsMask = generateEventKeywords(eventKeywords)
-        eventValue = eventNode.getAttribute('value')
-        eventVersion = eventNode.getAttribute('version')
-        eventLevel = eventNode.getAttribute('level')
+    addEvents = []
+    for attrs in events:
+        eventName = attrs['symbol']
+        eventKeywords = attrs.get('keywords', '')
+        eventKeywordsMask = keywordMask(eventKeywords)
+        eventValue = attrs.get('value', '')
+        eventVersion = attrs.get('version', '')
+        eventLevel = attrs.get('level', '')
         eventLevel = eventLevel.replace("win:", "EventPipeEventLevel::")
-        taskName = eventNode.getAttribute('task')
 
         needStack = "true"
         for nostackentry in exclusionList.nostack:
@@ -160,49 +205,69 @@ def generateClrEventPipeWriteEventsImpl(
             if tokens[2] == eventName:
                 needStack = "false"
 
-        initEvent = """    EventPipeEvent%s = EventPipeProvider%s->AddEvent(%s,%s,%s,%s,%s);
-""" % (eventName, providerPrettyName, eventValue, eventKeywordsMask, eventVersion, eventLevel, needStack)
+        addEvents.append(eventPipeAddEvent % (
+            eventName, providerPrettyName, eventValue, eventKeywordsMask, eventVersion, eventLevel, needStack))
 
-        WriteEventImpl.append(initEvent)
-    WriteEventImpl.append("}")
+    out.write(eventPipeProviderInitImpl % {
+        'extern': 'extern "C" ' if extern else '',
+        'providerPrettyName': providerPrettyName,
+        'addEvents': ''.join(addEvents)})
 
-    return ''.join(WriteEventImpl)
 
+# specialCaseSizes flattened to (template name, parameter name) -> size expression
+specialCaseSizeOverrides = {
+    (templateName, paramName): size
+    for templateName, sizes in specialCaseSizes.items()
+    for paramName, size in sizes.items()}
 
-def generateWriteEventBody(template, providerName, eventName):
-    header = """
-    char stackBuffer[%s];
+eventPipeWriteEventPrologue = """
+    char stackBuffer[%(estimatedSize)s];
     char *buffer = stackBuffer;
     size_t offset = 0;
-    size_t size = %s;
+    size_t size = %(estimatedSize)s;
     bool fixedBuffer = true;
 
     bool success = true;
-""" % (template.estimated_size, template.estimated_size)
+%(packing)s
+
+    if (!success)
+    {
+        if (!fixedBuffer)
+            delete[] buffer;
+        return ERROR_WRITE_FAULT;
+    }
+
+"""
 
+# The buffer setup, the parameter packing and the error check only depend on the
+# template, so they are generated once per template and shared by all its events
+@memoize
+def generateWriteEventPrologue(template):
     fnSig = template.signature
     pack_list = []
     for paramName in fnSig.paramlist:
         parameter = fnSig.getParam(paramName)
 
-        if paramName in template.structs:
+        if parameter.is_struct:
             size = "(int)%s_ElementSize * (int)%s" % (
                 paramName, parameter.prop)
-            if template.name in specialCaseSizes and paramName in specialCaseSizes[template.name]:
-                size = "(int)(%s)" % specialCaseSizes[template.name][paramName]
+            sizeOverride = specialCaseSizeOverrides.get((template.name, paramName))
+            if sizeOverride is not None:
+                size = "(int)(%s)" % sizeOverride
             pack_list.append(
                 "    success &= WriteToBuffer((const BYTE *)%s, %s, buffer, offset, size, fixedBuffer);" %
                 (paramName, size))
-        elif paramName in template.arrays:
+        elif parameter.is_array:
             size = "sizeof(%s) * (int)%s" % (
                 lttngDataTypeMapping[parameter.winType],
                 parameter.prop)
-            if template.name in specialCaseSizes and paramName in specialCaseSizes[template.name]:
-                size = "(int)(%s)" % specialCaseSizes[template.name][paramName]
+            sizeOverride = specialCaseSizeOverrides.get((template.name, paramName))
+            if sizeOverride is not None:
+                size = "(int)(%s)" % sizeOverride
             pack_list.append(
                 "    success &= WriteToBuffer((const BYTE *)%s, %s, buffer, offset, size, fixedBuffer);" %
                 (paramName, size))
-        elif parameter.winType == "win:GUID":
+        elif parameter.is_guid:
             pack_list.append(
                 "    success &= WriteToBuffer(*%s, buffer, offset, size, fixedBuffer);" %
                 (parameter.name,))
@@ -211,39 +276,40 @@ def generateWriteEventBody(template, providerName, eventName):
                 "    success &= WriteToBuffer(%s, buffer, offset, size, fixedBuffer);" %
                 (parameter.name,))
 
-    code = "\n".join(pack_list) + "\n\n"
+    return eventPipeWriteEventPrologue % {
+        'estimatedSize': template.estimated_size,
+        'packing': "\n".join(pack_list)}
 
-    checking = """    if (!success)
-    {
-        if (!fixedBuffer)
-            delete[] buffer;
-        return ERROR_WRITE_FAULT;
-    }\n\n"""
-
-    body = "    EventPipe::WriteEvent(*EventPipeEvent" + \
-        eventName + ", (BYTE *)buffer, (unsigned int)offset, ActivityId, RelatedActivityId);\n"
+eventPipeWriteEventEpilogue = """    EventPipe::WriteEvent(*EventPipeEvent%s, (BYTE *)buffer, (unsigned int)offset, ActivityId, RelatedActivityId);
 
-    footer = """
     if (!fixedBuffer)
         delete[] buffer;
 """
 
-    return header + code + checking + body + footer
+def generateWriteEventBody(template, providerName, eventName):
+    return generateWriteEventPrologue(template) + eventPipeWriteEventEpilogue % (eventName,)
 
 
-keywordMap = {}
+def makeKeywordMask(keywordMap):
+    # returns a function combining the masks of a whitespace separated list of keywords
+    getKeywordMask = keywordMap.__getitem__
 
-def generateEventKeywords(eventKeywords):
-    mask = 0
-    # split keywords if there are multiple
-    allKeywords = eventKeywords.split()
+    @memoize
+    def keywordMask(eventKeywords):
+        return reduce(operator.or_, map(getKeywordMask, eventKeywords.split()), 0)
 
-    for singleKeyword in allKeywords:
-        mask = mask | keywordMap[singleKeyword]
+    return keywordMask
 
-    return mask
+eventPipeProviderInitDeclaration = """%svoid Init%s();
 
-def generateEventPipeHelperFile(etwmanifest, eventpipe_directory, extern, dryRun):
+"""
+
+eventPipeInitProvidersAndEventsImpl = """%(initDeclarations)s%(extern)svoid InitProvidersAndEvents()
+{
+%(initCalls)s}"""
+
+def generateEventPipeHelperFile(providers, eventpipe_directory, extern, dryRun):
+    externC = 'extern "C" ' if extern else ''
     eventpipehelpersPath = os.path.join(eventpipe_directory, "eventpipehelpers.cpp")
     if dryRun:
         print(eventpipehelpersPath)
@@ -334,138 +400,112 @@ bool WriteToBuffer(const char *str, char *&buffer, size_t& offset, size_t& size,
 
 """)
 
-            tree = DOM.parse(etwmanifest)
-
-            for providerNode in tree.getElementsByTagName('provider'):
-                providerName = providerNode.getAttribute('name')
-                providerPrettyName = providerName.replace("Windows-", '')
-                providerPrettyName = providerPrettyName.replace("Microsoft-", '')
-                providerPrettyName = providerPrettyName.replace('-', '_')
-                if extern: helper.write(
-                    'extern "C" '
-                )
-                helper.write(
-                    "void Init" +
-                    providerPrettyName +
-                    "();\n\n")
-
-            if extern: helper.write(
-                'extern "C" '
+            initDeclarations = []
+            initCalls = []
+            for providerName, providerPrettyName, providerName_File in providers:
+                initDeclarations.append(eventPipeProviderInitDeclaration % (externC, providerPrettyName))
+                initCalls.append("    Init%s();\n" % (providerPrettyName,))
+
+            helper.write(eventPipeInitProvidersAndEventsImpl % {
+                'extern': externC,
+                'initDeclarations': ''.join(initDeclarations),
+                'initCalls': ''.join(initCalls)})
+
+def generateEventPipeImplFile(provider):
+    providerName = provider['name']
+    providerPrettyName = provider['prettyName']
+
+    with open_for_update(provider['path']) as eventpipeImpl:
+        eventpipeImpl.write(stdprolog_cpp)
+        eventpipeImpl.write(eventpipe_impl_header)
+        eventpipeImpl.write(
+            "const WCHAR* %sName = W(\"%s\");\n" % (
+                providerPrettyName,
+                providerName
             )
-            helper.write("void InitProvidersAndEvents()\n{\n")
-            for providerNode in tree.getElementsByTagName('provider'):
-                providerName = providerNode.getAttribute('name')
-                providerPrettyName = providerName.replace("Windows-", '')
-                providerPrettyName = providerPrettyName.replace("Microsoft-", '')
-                providerPrettyName = providerPrettyName.replace('-', '_')
-                helper.write("    Init" + providerPrettyName + "();\n")
-            helper.write("}")
-
-        helper.close()
+        )
+        eventpipeImpl.write(
+            "EventPipeProvider *EventPipeProvider%s = nullptr;\n" % (
+                providerPrettyName,
+            )
+        )
+        generateClrEventPipeWriteEventsImpl(
+            eventpipeImpl,
+            providerName,
+            providerPrettyName,
+            provider['events'],
+            provider['templates'],
+            makeKeywordMask(provider['keywordMap']),
+            provider['extern'],
+            provider['exclusionList'])
+        eventpipeImpl.write("\n")
 
 def generateEventPipeImplFiles(
-        etwmanifest, eventpipe_directory, extern, exclusionList, dryRun):
-    tree = DOM.parse(etwmanifest)
-
-    # Find the src directory starting with the assumption that
-    # A) It is named 'src'
-    # B) This script lives in it
-    src_dirname = os.path.dirname(__file__)
-    while os.path.basename(src_dirname) != "src":
-        src_dirname = os.path.dirname(src_dirname)
-
-        if os.path.basename(src_dirname) == "":
-            raise IOError("Could not find the Core CLR 'src' directory")
-
-    for providerNode in tree.getElementsByTagName('provider'):
-        providerName = providerNode.getAttribute('name')
-
-        providerPrettyName = providerName.replace("Windows-", '')
-        providerPrettyName = providerPrettyName.replace("Microsoft-", '')
-        providerName_File = providerPrettyName.replace('-', '')
-        providerName_File = providerName_File.lower()
-        providerPrettyName = providerPrettyName.replace('-', '_')
+        providerNodes, providers, namespace, keywordMap, eventpipe_directory, extern, exclusionList, dryRun):
+    # the provider files are independent of each other, so they are generated in parallel
+    # from plain picklable data rather than from the ElementTree nodes, the keyword mask
+    # function is a closure and is therefore built by each worker from the keyword map
+    payloads = []
+    for providerNode, (providerName, providerPrettyName, providerName_File) in zip(providerNodes, providers):
         eventpipefile = os.path.join(eventpipe_directory, providerName_File + ".cpp")
         if dryRun:
             print(eventpipefile)
         else:
-            with open_for_update(eventpipefile) as eventpipeImpl:
-                eventpipeImpl.write(stdprolog_cpp)
-
-                header = """
-#include "{root:s}/vm/common.h"
-#include "{root:s}/vm/eventpipeprovider.h"
-#include "{root:s}/vm/eventpipeevent.h"
-#include "{root:s}/vm/eventpipe.h"
-
-#if defined(FEATURE_PAL)
-#define wcslen PAL_wcslen
-#endif
-
-bool ResizeBuffer(char *&buffer, size_t& size, size_t currLen, size_t newSize, bool &fixedBuffer);
-bool WriteToBuffer(PCWSTR str, char *&buffer, size_t& offset, size_t& size, bool &fixedBuffer);
-bool WriteToBuffer(const char *str, char *&buffer, size_t& offset, size_t& size, bool &fixedBuffer);
-bool WriteToBuffer(const BYTE *src, size_t len, char *&buffer, size_t& offset, size_t& size, bool &fixedBuffer);
-
-template <typename T>
-bool WriteToBuffer(const T &value, char *&buffer, size_t& offset, size_t& size, bool &fixedBuffer)
-{{
-    if (sizeof(T) + offset > size)
-    {{
-        if (!ResizeBuffer(buffer, size, offset, size + sizeof(T), fixedBuffer))
-            return false;
-    }}
-
-    memcpy(buffer + offset, (char *)&value, sizeof(T));
-    offset += sizeof(T);
-    return true;
-}}
-
-""".format(root=src_dirname.replace('\\', '/'))
-
-                eventpipeImpl.write(header)
-                eventpipeImpl.write(
-                    "const WCHAR* %sName = W(\"%s\");\n" % (
-                        providerPrettyName,
-                        providerName
-                    )
-                )
-                eventpipeImpl.write(
-                    "EventPipeProvider *EventPipeProvider%s = nullptr;\n" % (
-                        providerPrettyName,
-                    )
-                )
-                templateNodes = providerNode.getElementsByTagName('template')
-                allTemplates = parseTemplateNodes(templateNodes)
-                eventNodes = providerNode.getElementsByTagName('event')
-                eventpipeImpl.write(
-                    generateClrEventPipeWriteEventsImpl(
-                        providerName,
-                        eventNodes,
-                        allTemplates,
-                        extern,
-                        exclusionList) + "\n")
+            templateNodes = providerNode.iter(namespace + 'template')
+            payloads.append({
+                'name': providerName,
+                'prettyName': providerPrettyName,
+                'path': eventpipefile,
+                'events': [dict(eventNode.attrib) for eventNode in providerNode.iter(namespace + 'event')],
+                'templates': parseTemplateElements(templateNodes, namespace),
+                'keywordMap': keywordMap,
+                'extern': extern,
+                'exclusionList': exclusionList})
+
+    cpuCount = multiprocessing.cpu_count()
+    if len(payloads) > 1 and cpuCount > 1:
+        pool = multiprocessing.Pool(min(len(payloads), cpuCount))
+        try:
+            pool.map(generateEventPipeImplFile, payloads)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for payload in payloads:
+            generateEventPipeImplFile(payload)
 
 def generateEventPipeFiles(
         etwmanifest, intermediate, extern, exclusionList, dryRun):
     eventpipe_directory = os.path.join(intermediate, eventpipe_dirname)
-    tree = DOM.parse(etwmanifest)
+
+    # parse the manifest once and share the provider nodes between the generators
+    tree = ET.parse(etwmanifest)
+    namespace = getNamespace(tree.getroot())
+    providerNodes = list(tree.iter(namespace + 'provider'))
+
+    # generate all keywords before any event needs their masks
+    keywordMap = dict(
+        (keywordNode.get('name'), int(keywordNode.get('mask'), 0))
+        for keywordNode in tree.iter(namespace + 'keyword'))
+
+    # normalize the provider names once for all the generators
+    providers = []
+    for providerNode in providerNodes:
+        providerName = providerNode.get('name')
+        providers.append((providerName, getProviderPrettyName(providerName), getProviderFileName(providerName)))
 
     if not os.path.exists(eventpipe_directory):
         os.makedirs(eventpipe_directory)
 
     # generate helper file
-    generateEventPipeHelperFile(etwmanifest, eventpipe_directory, extern, dryRun)
-
-    # generate all keywords
-    for keywordNode in tree.getElementsByTagName('keyword'):
-        keywordName = keywordNode.getAttribute('name')
-        keywordMask = keywordNode.getAttribute('mask')
-        keywordMap[keywordName] = int(keywordMask, 0)
+    generateEventPipeHelperFile(providers, eventpipe_directory, extern, dryRun)
 
     # generate .cpp file for each provider
     generateEventPipeImplFiles(
-        etwmanifest,
+        providerNodes,
+        providers,
+        namespace,
+        keywordMap,
         eventpipe_directory,
         extern,
         exclusionList,
@@ -494,7 +534,7 @@ def main(argv):
                                     help='if specified, will output the names of the generated files instead of generating the files' )
     args, unknown = parser.parse_known_args(argv)
     if unknown:
-        print('Unknown argument(s): ', ', '.join(unknown))
+        print('Unknown argument(s):  %s' % (', '.join(unknown),))
         return 1
 
     sClrEtwAllMan = args.man
@@ -102,7 +102,9 @@ def getParamSequenceSize(paramSequence, estimate):
     return total, pointers
 
 
-class Template:
+class Template(object):
+    __slots__ = ("name", "signature", "structs", "arrays", "param_rendering")
+
     def __repr__(self):
         return "<Template " + self.name + ">"
 
@@ -117,6 +119,13 @@ class Template:
                 if not self.signature.getParam(dependency):
                     self.signature.append(dependency, fnPrototypes.getParam(dependency))
 
+        # (type, count suffix, parameter) of each parameter in signature order, resolved once
+        # so that the code generators do not have to repeat the lookups for every event
+        self.param_rendering = []
+        for paramName in self.signature.paramlist:
+            fnparam = self.signature.getParam(paramName)
+            self.param_rendering.append((palDataTypeMapping[fnparam.winType], palDataTypeMapping[fnparam.count], fnparam))
+
     def getFnParam(self, name):
         return self.signature.getParam(name)
 
@@ -137,7 +146,9 @@ class Template:
 
 
 
-class FunctionSignature:
+class FunctionSignature(object):
+    __slots__ = ("LUT", "paramlist")
+
     def __repr__(self):
         return ", ".join(self.paramlist)
 
@@ -155,14 +166,19 @@ class FunctionSignature:
     def getLength(self):
         return len(self.paramlist)
 
-class FunctionParameter:
+class FunctionParameter(object):
+    __slots__ = ("winType", "name", "prop", "count", "is_struct", "is_array", "is_guid")
+
     def __repr__(self):
         return self.name
 
-    def __init__(self,winType,name,count,prop):
+    def __init__(self,winType,name,count,prop,is_struct=False,is_array=False):
         self.winType  = winType   #ETW type as given in the manifest
         self.name     = name      #parameter name as given in the manifest
         self.prop     = prop      #any special property as determined by the manifest and developer
+        self.is_struct = is_struct #struct marshalled as a blob of Count elements
+        self.is_array  = is_array  #array whose length is given by another parameter
+        self.is_guid   = winType == "win:GUID"
         #self.count               #indicates if the parameter is a pointer
         if  count == "win:null":
             self.count    = "win:null"
@@ -184,82 +200,99 @@ def getTopLevelElementsByTagName(node,tag):
 ignoredXmlTemplateAttribes = frozenset(["map","outType"])
 usedXmlTemplateAttribes    = frozenset(["name","inType","count", "length"])
 
+# builds a Template from the attribute dictionaries of the top level data and struct nodes of a template
+# so that it can be shared between the xml.dom.minidom and xml.etree.ElementTree based parsers
+def parseTemplate(templateName, dataAttributes, structAttributes):
+    structCounts = {}
+    arrays = {}
+    var_Dependecies = {}
+    fnPrototypes    = FunctionSignature()
+
+    # Validate that no new attributes has been added to manifest
+    for attributes in dataAttributes:
+        for attrib_name in attributes:
+            if attrib_name not in ignoredXmlTemplateAttribes and attrib_name not in usedXmlTemplateAttribes:
+                raise ValueError('unknown attribute: '+ attrib_name + ' in template:'+ templateName)
+
+    for attributes in dataAttributes:
+        variable = attributes.get('name', '')
+        wintype = attributes.get('inType', '')
+
+        #count and length are the same
+        wincount  = attributes.get('count', '')
+        winlength = attributes.get('length', '')
+
+        var_Props = None
+        var_dependency = [variable]
+        is_array = False
+        if  winlength:
+            if wincount:
+                raise Exception("both count and length property found on: " + variable + "in template: " + templateName)
+            wincount = winlength
+
+        if (wincount.isdigit() and int(wincount) ==1):
+            wincount = ''
+
+        if  wincount:
+            if (wincount.isdigit()):
+                var_Props = wincount
+            elif  fnPrototypes.getParam(wincount):
+                var_Props = wincount
+                var_dependency.insert(0, wincount)
+                arrays[variable] = wincount
+                is_array = True
+
+        #construct the function signature
+
+        if  wintype == "win:GUID":
+            var_Props = "sizeof(GUID)/sizeof(int)"
+
+        var_Dependecies[variable] = var_dependency
+        fnparam        = FunctionParameter(wintype,variable,wincount,var_Props,is_array=is_array)
+        fnPrototypes.append(variable,fnparam)
+
+    for attributes in structAttributes:
+        structName   = attributes.get('name', '')
+        countVarName = attributes.get('count', '')
+
+        assert(countVarName == "Count")
+        assert(countVarName in fnPrototypes.paramlist)
+        if not countVarName:
+            raise ValueError("Struct '%s' in template '%s' does not have an attribute count." % (structName, templateName))
+
+        structCounts[structName] = countVarName
+        var_Dependecies[structName] = [countVarName, structName]
+        fnparam_pointer = FunctionParameter("win:Struct", structName, "win:count", countVarName, is_struct=True)
+        fnPrototypes.append(structName, fnparam_pointer)
+
+    return Template(templateName, fnPrototypes, var_Dependecies, structCounts, arrays)
+
 def parseTemplateNodes(templateNodes):
 
     #return values
     allTemplates           = {}
 
     for templateNode in templateNodes:
-        structCounts = {}
-        arrays = {}
-        templateName    = templateNode.getAttribute('tid')
-        var_Dependecies = {}
-        fnPrototypes    = FunctionSignature()
-        dataNodes       = getTopLevelElementsByTagName(templateNode,'data')
-
-        # Validate that no new attributes has been added to manifest
-        for dataNode in dataNodes:
-            nodeMap = dataNode.attributes
-            for attrib in nodeMap.values():
-                attrib_name = attrib.name
-                if attrib_name not in ignoredXmlTemplateAttribes and attrib_name not in usedXmlTemplateAttribes:
-                    raise ValueError('unknown attribute: '+ attrib_name + ' in template:'+ templateName)
-
-        for dataNode in dataNodes:
-            variable = dataNode.getAttribute('name')
-            wintype = dataNode.getAttribute('inType')
-
-            #count and length are the same
-            wincount  = dataNode.getAttribute('count')
-            winlength = dataNode.getAttribute('length');
-
-            var_Props = None
-            var_dependency = [variable]
-            if  winlength:
-                if wincount:
-                    raise Exception("both count and length property found on: " + variable + "in template: " + templateName)
-                wincount = winlength
-
-            if (wincount.isdigit() and int(wincount) ==1):
-                wincount = ''
-
-            if  wincount:
-                if (wincount.isdigit()):
-                    var_Props = wincount
-                elif  fnPrototypes.getParam(wincount):
-                    var_Props = wincount
-                    var_dependency.insert(0, wincount)
-                    arrays[variable] = wincount
-
-            #construct the function signature
-
-            if  wintype == "win:GUID":
-                var_Props = "sizeof(GUID)/sizeof(int)"
-
-            var_Dependecies[variable] = var_dependency
-            fnparam        = FunctionParameter(wintype,variable,wincount,var_Props)
-            fnPrototypes.append(variable,fnparam)
-
-        structNodes = getTopLevelElementsByTagName(templateNode,'struct')
-
-        for structToBeMarshalled in structNodes:
-            structName   = structToBeMarshalled.getAttribute('name')
-            countVarName = structToBeMarshalled.getAttribute('count')
-
-            assert(countVarName == "Count")
-            assert(countVarName in fnPrototypes.paramlist)
-            if not countVarName:
-                raise ValueError("Struct '%s' in template '%s' does not have an attribute count." % (structName, templateName))
-
-            names = [x.attributes['name'].value for x in structToBeMarshalled.getElementsByTagName("data")]
-            types = [x.attributes['inType'].value for x in structToBeMarshalled.getElementsByTagName("data")]
-
-            structCounts[structName] = countVarName
-            var_Dependecies[structName] = [countVarName, structName]
-            fnparam_pointer = FunctionParameter("win:Struct", structName, "win:count", countVarName)
-            fnPrototypes.append(structName, fnparam_pointer)
-
-        allTemplates[templateName] = Template(templateName, fnPrototypes, var_Dependecies, structCounts, arrays)
+        templateName     = templateNode.getAttribute('tid')
+        dataAttributes   = [dict(dataNode.attributes.items()) for dataNode in getTopLevelElementsByTagName(templateNode,'data')]
+        structAttributes = [dict(structNode.attributes.items()) for structNode in getTopLevelElementsByTagName(templateNode,'struct')]
+
+        allTemplates[templateName] = parseTemplate(templateName, dataAttributes, structAttributes)
+
+    return allTemplates
+
+# xml.etree.ElementTree counterpart of parseTemplateNodes, namespace is the '{uri}' prefix of the manifest tags
+def parseTemplateElements(templateElements, namespace=''):
+
+    #return values
+    allTemplates           = {}
+
+    for templateElement in templateElements:
+        templateName     = templateElement.get('tid')
+        dataAttributes   = [dataElement.attrib for dataElement in templateElement.findall(namespace + 'data')]
+        structAttributes = [structElement.attrib for structElement in templateElement.findall(namespace + 'struct')]
+
+        allTemplates[templateName] = parseTemplate(templateName, dataAttributes, structAttributes)
 
     return allTemplates
 